@@ -11,6 +11,7 @@ import re
 import shutil
 import subprocess
 import sys
+import threading
 import typing as t
 from distutils.version import LooseVersion
 from typing import Dict, Generic, KeysView, List, Optional, TypeVar, Union, overload
@@ -40,6 +41,10 @@ WindowDict = t.Dict[str, t.Any]
 WindowOptionDict = t.Dict[str, t.Any]
 PaneDict = t.Dict[str, t.Any]
 
+#: Session :class:`ControlMode` clients attach to, hidden from
+#: :class:`~libtmux.Server` listings
+CONTROL_MODE_SESSION = "__libtmux_control__"
+
 
 class EnvironmentMixin:
 
@@ -272,6 +277,202 @@ class tmux_cmd:
         logger.debug("self.stdout for {}: \n{}".format(" ".join(cmd), self.stdout))
 
 
+def _control_mode_quote(arg: t.Any) -> str:
+    """Quote ``arg`` for a tmux command line, like :func:`shlex.quote`."""
+    s = str_from_console(arg)
+    if "\n" in s:
+        raise exc.ControlModeError("newlines can't be sent in control mode")
+    if s and re.fullmatch(r"[\w@%+=:,./-]+", s):
+        return s
+    return "'" + s.replace("'", "'\\''") + "'"
+
+
+class ControlMode:
+
+    """
+    Long-lived :term:`tmux(1)` control mode client, ``tmux -C``.
+
+    Commands are written to the client's stdin and their output read back from
+    the ``%begin`` / ``%end`` blocks it prints, saving a process per command.
+
+    The client attaches to :data:`CONTROL_MODE_SESSION`, creating it if needed,
+    with the ``no-output`` and ``ignore-size`` flags so it neither receives pane
+    output nor resizes windows. The session is destroyed once its last control
+    client exits. ``-N`` keeps the client from starting a server. Requires tmux
+    3.2 or newer.
+
+    Parameters
+    ----------
+    args : str
+        Global flags, e.g. ``-Lsocket_name``
+
+    Raises
+    ------
+    :exc:`exc.ControlModeError`
+    """
+
+    def __init__(self, *args: str) -> None:
+        tmux_bin = shutil.which("tmux")
+        if not tmux_bin:
+            raise (exc.TmuxCommandNotFound)
+
+        self.args = args
+        self._lock = threading.Lock()
+        self.process = subprocess.Popen(
+            [
+                tmux_bin,
+                *args,
+                "-N",
+                "-C",
+                "new-session",
+                "-A",
+                "-s",
+                CONTROL_MODE_SESSION,
+                "-f",
+                "no-output,ignore-size",
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+        try:
+            # reply to new-session itself
+            self._read_block(own=False)
+            # the client's own session is the default target
+            _, stderr, returncode = self.cmd("set-option", "destroy-unattached", "on")
+            if returncode:
+                raise exc.ControlModeError(stderr)
+        except exc.ControlModeError:
+            self.close()
+            raise
+
+    @staticmethod
+    def can_send(*args: t.Any) -> bool:
+        """
+        Return True if ``args`` fit on a control mode command line.
+
+        Arguments with newlines can't be sent and need a ``tmux(1)`` process.
+        """
+        return not any("\n" in str_from_console(arg) for arg in args)
+
+    @property
+    def alive(self) -> bool:
+        """Return True if the client process is still running."""
+        return self.process.poll() is None
+
+    def _read_block(self, own: bool = True) -> t.Tuple[t.List[str], bool]:
+        """
+        Return output of the next command block and whether it succeeded.
+
+        Notifications (``%session-changed``, ...) between blocks are skipped, as
+        are blocks for commands the client didn't send when ``own`` is True.
+        """
+        assert self.process.stdout is not None
+        begin: t.Optional[t.List[str]] = None
+        lines: t.List[str] = []
+        while True:
+            raw = self.process.stdout.readline()
+            if not raw:
+                raise exc.ControlModeError("tmux control mode client exited")
+            line = console_to_str(raw).rstrip("\n")
+
+            if begin is None:
+                if line.startswith("%begin "):
+                    begin = line.split(" ")
+                continue
+
+            guard = line.split(" ")
+            if guard[0] in ("%end", "%error") and guard[1:3] == begin[1:3]:
+                if not own or int(begin[3]) & 1:
+                    return lines, guard[0] == "%end"
+                begin, lines = None, []
+                continue
+
+            lines.append(line)
+
+    def cmd(self, *args: t.Any) -> t.Tuple[t.List[str], t.List[str], int]:
+        """
+        Run tmux command(s) and return ``stdout``, ``stderr`` and return code.
+
+        Commands are split at ``;`` arguments and sent one at a time, stopping
+        at the first error, like :term:`tmux(1)` does for chained commands.
+
+        Raises
+        ------
+        :exc:`exc.ControlModeError`
+        """
+        commands: t.List[t.List[str]] = [[]]
+        for arg in args:
+            if arg == ";":
+                commands.append([])
+            else:
+                commands[-1].append(_control_mode_quote(arg))
+
+        stdout: t.List[str] = []
+        with self._lock:
+            assert self.process.stdin is not None
+            for command in commands:
+                try:
+                    self.process.stdin.write(os.fsencode(" ".join(command) + "\n"))
+                    self.process.stdin.flush()
+                except OSError as e:
+                    raise exc.ControlModeError(e) from e
+
+                output, ok = self._read_block()
+                if not ok:
+                    return stdout, output, 1
+                stdout += output
+
+        return stdout, [], 0
+
+    def close(self) -> None:
+        """Detach the client, letting tmux destroy its session if unused."""
+        if self.process.stdin is not None:
+            try:
+                self.process.stdin.close()
+            except OSError:
+                pass
+        try:
+            self.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        if self.process.stdout is not None:
+            self.process.stdout.close()
+
+
+class control_mode_cmd(tmux_cmd):
+
+    """
+    :class:`tmux_cmd` sent through a :class:`ControlMode` client.
+
+    Provides the same ``cmd``, ``stdout``, ``stderr`` and ``returncode``
+    attributes without spawning a process.
+
+    Raises
+    ------
+    :exc:`exc.ControlModeError`
+    """
+
+    def __init__(self, control_mode: ControlMode, *args: t.Any) -> None:
+        self.cmd = ["tmux", *control_mode.args, *(str_from_console(a) for a in args)]
+
+        stdout, self.stderr, self.returncode = control_mode.cmd(*args)
+
+        # remove trailing newlines from stdout
+        while stdout and stdout[-1] == "":
+            stdout.pop()
+        self.stderr = list(filter(None, self.stderr))  # filter empty values
+
+        if "has-session" in self.cmd and len(self.stderr) and not stdout:
+            self.stdout = [self.stderr[0]]
+        else:
+            self.stdout = stdout
+
+        logger.debug("self.stdout for {}: \n{}".format(" ".join(self.cmd), self.stdout))
+
+
 # class TmuxMappingObject(t.Mapping[str, t.Union[str,int,bool]]):
 class TmuxMappingObject(t.Mapping[t.Any, t.Any]):
     r"""Base: :py:class:`MutableMapping`.
@@ -21,6 +21,11 @@ class TmuxCommandNotFound(LibTmuxException):
     """Application binary for tmux not found."""
 
 
+class ControlModeError(LibTmuxException):
+
+    """tmux control mode client could not be started or exited."""
+
+
 class VersionTooLow(LibTmuxException):
 
     """Raised if tmux below the minimum version to use libtmux."""
@@ -4,15 +4,20 @@ libtmux.server
 ~~~~~~~~~~~~~~
 
 """
+import functools
 import logging
 import os
+import threading
+import time
 import typing as t
+from types import TracebackType
 
-from libtmux.common import tmux_cmd
+from libtmux.common import ControlMode, control_mode_cmd, tmux_cmd
 from libtmux.session import Session
 
 from . import exc, formats
 from .common import (
+    CONTROL_MODE_SESSION,
     EnvironmentMixin,
     PaneDict,
     SessionDict,
@@ -24,6 +29,86 @@ from .common import (
 
 logger = logging.getLogger(__name__)
 
+#: tmux commands whose output :class:`Server` caches, see :attr:`Server.cache_ttl`
+LIST_COMMANDS = frozenset(("list-sessions", "list-windows", "list-panes"))
+
+#: :func:`~libtmux.common.has_gte_version`, running ``tmux -V`` once per version
+_has_gte_version = functools.lru_cache(maxsize=None)(has_gte_version)
+
+#: tmux commands :attr:`Server.control_mode` still spawns a client for. They act
+#: on the calling client, inherit its environment or end the server.
+CLIENT_COMMANDS = frozenset(
+    (
+        "attach-session",
+        "attach",
+        "detach-client",
+        "detach",
+        "kill-server",
+        "new-session",
+        "new",
+        "switch-client",
+        "switchc",
+    )
+)
+
+#: tmux commands after which :attr:`Server.control_mode` stops its client if its
+#: session is the last one, so the server can exit as it would without it
+_KILL_COMMANDS = frozenset(
+    ("kill-session", "kill-window", "killw", "kill-pane", "killp")
+)
+
+#: :class:`Server` attributes :meth:`Server.cmd` turns into global ``tmux(1)`` flags
+GLOBAL_FLAG_ATTRIBUTES = frozenset(
+    ("colors", "config_file", "socket_path", "socket_name")
+)
+
+_SESSION_KEYS = tuple(formats.SESSION_FORMATS)
+_WINDOW_KEYS = ("session_name", "session_id", *formats.WINDOW_FORMATS)
+_PANE_KEYS = (
+    "session_name",
+    "session_id",
+    "window_index",
+    "window_id",
+    "window_name",
+    *formats.PANE_FORMATS,
+)
+
+#: Index of ``session_id`` in :data:`_SESSION_KEYS`
+_SESSION_ID_FIELD = _SESSION_KEYS.index("session_id")
+
+_SESSION_FORMAT = formats.FORMAT_SEPARATOR.join("#{%s}" % f for f in _SESSION_KEYS)
+_WINDOW_FORMAT = formats.FORMAT_SEPARATOR.join("#{%s}" % f for f in _WINDOW_KEYS)
+_PANE_FORMAT = formats.FORMAT_SEPARATOR.join("#{%s}" % f for f in _PANE_KEYS)
+
+_SESSION_FMT = "-F" + _SESSION_FORMAT
+
+#: ``list-sessions ; list-windows -a ; list-panes -a``, rows prefixed with the
+#: key :meth:`Server._refresh_all` files them under
+_LIST_ALL_ARGS = (
+    "list-sessions",
+    "-Fsessions" + formats.FORMAT_SEPARATOR + _SESSION_FORMAT,
+    ";",
+    "list-windows",
+    "-a",
+    "-Fwindows" + formats.FORMAT_SEPARATOR + _WINDOW_FORMAT,
+    ";",
+    "list-panes",
+    "-a",
+    "-Fpanes" + formats.FORMAT_SEPARATOR + _PANE_FORMAT,
+)
+
+#: Separators in a complete :meth:`Server._refresh_all` row, by tag. Fewer means
+#: a value such as ``pane_current_path`` held a newline and the row goes on.
+_LIST_ALL_SEPARATORS = {
+    "sessions": len(_SESSION_KEYS) - 1,
+    "windows": len(_WINDOW_KEYS) - 1,
+    "panes": len(_PANE_KEYS) - 1,
+}
+
+#: Start of :data:`~libtmux.common.CONTROL_MODE_SESSION` rows, which all begin
+#: with ``session_name``
+_CONTROL_MODE_ROW = CONTROL_MODE_SESSION + formats.FORMAT_SEPARATOR
+
 
 class Server(TmuxRelationalObject["Session", "SessionDict"], EnvironmentMixin):
 
@@ -46,6 +131,7 @@ class Server(TmuxRelationalObject["Session", "SessionDict"], EnvironmentMixin):
     socket_path : str, optional
     config_file : str, optional
     colors : str, optional
+    control_mode : bool, optional
 
     Examples
     --------
@@ -86,10 +172,22 @@ class Server(TmuxRelationalObject["Session", "SessionDict"], EnvironmentMixin):
     """Passthrough to ``[-f file]``"""
     colors = None
     """``-2`` or ``-8``"""
+    cache_ttl = 0.1
+    """Seconds ``list-sessions``, ``list-windows`` and ``list-panes`` output is
+    reused for. Any other command sent via :meth:`Server.cmd` clears the cache.
+    ``0`` disables caching."""
+    control_mode = False
+    """Send commands through one long-lived ``tmux -C`` client, see
+    :class:`~libtmux.common.ControlMode`. Commands without a target act on the
+    client's own session. Falls back to a ``tmux(1)`` process per command on
+    tmux older than 3.2, and after the client failed to start (e.g. no server is
+    running) until the next ``new-session``. Setting it to False stops the
+    client, see :meth:`~.close`."""
     child_id_attribute = "session_id"
     """Unique child ID used by :class:`~libtmux.common.TmuxRelationalObject`"""
     formatter_prefix = "server_"
     """Namespace used for :class:`~libtmux.common.TmuxMappingObject`"""
+    _global_flags: t.Optional[t.Tuple[str, ...]] = None
 
     def __init__(
         self,
@@ -97,11 +195,18 @@ class Server(TmuxRelationalObject["Session", "SessionDict"], EnvironmentMixin):
         socket_path: t.Optional[str] = None,
         config_file: t.Optional[str] = None,
         colors: t.Optional[int] = None,
+        control_mode: bool = False,
         **kwargs: t.Any,
     ) -> None:
         EnvironmentMixin.__init__(self, "-g")
         self._windows: t.List[WindowDict] = []
         self._panes: t.List[PaneDict] = []
+        self._list_cache: t.Dict[str, t.Tuple[float, t.List[str]]] = {}
+        self._list_cache_generation = 0
+        self._list_cache_lock = threading.Lock()
+        self._control_client: t.Optional[ControlMode] = None
+        self._control_client_failed = False
+        self._control_client_lock = threading.RLock()
 
         if socket_name:
             self.socket_name = socket_name
@@ -115,6 +220,9 @@ class Server(TmuxRelationalObject["Session", "SessionDict"], EnvironmentMixin):
         if colors:
             self.colors = colors
 
+        if control_mode:
+            self.control_mode = control_mode
+
     def cmd(self, *args: t.Any, **kwargs: t.Any) -> tmux_cmd:
         """
         Execute tmux command and return output.
@@ -129,61 +237,279 @@ class Server(TmuxRelationalObject["Session", "SessionDict"], EnvironmentMixin):
 
             Renamed from ``.tmux`` to ``.cmd``.
         """
+        # anything besides listing may change what tmux would list
+        changes_listing = not args or args[0] not in LIST_COMMANDS
+        if changes_listing:
+            self._list_cache.clear()
+            self._list_cache_generation += 1
+
+        try:
+            return self._cmd(args, kwargs)
+        finally:
+            if changes_listing:
+                # again for listings fetched while the command ran
+                self._list_cache.clear()
+                self._list_cache_generation += 1
+
+    def _cmd(self, args: t.Tuple[t.Any, ...], kwargs: t.Dict[str, t.Any]) -> tmux_cmd:
+        """Run :meth:`~.cmd`, through the :attr:`~.control_mode` client if used."""
+        prefix = self._global_flags
+        if prefix is None:
+            prefix = self._global_flags = self._compute_global_flags()
+
+        if args and args[0] in ("new-session", "new"):
+            # may start the server a failed client needed
+            self._control_client_failed = False
+        elif (
+            self.control_mode
+            and not self._control_client_failed
+            and args
+            and args[0] not in CLIENT_COMMANDS
+            # tmux_cmd options, the control mode client takes none
+            and not kwargs
+            and ControlMode.can_send(*args)
+            and _has_gte_version("3.2")
+        ):
+            try:
+                client = self._get_control_client(prefix)
+                proc = control_mode_cmd(client, *args)
+            except exc.ControlModeError as e:
+                logger.debug(f"control mode unavailable, spawning tmux: {e}")
+                self.close()
+            else:
+                # the command ran, whatever happens here it isn't sent again
+                if not _KILL_COMMANDS.isdisjoint(args):
+                    try:
+                        self._close_unused_control_client(client)
+                    except exc.ControlModeError as e:
+                        logger.debug(f"control mode client failed: {e}")
+                        self.close()
+                return proc
+
+        return tmux_cmd(*prefix, *args, **kwargs)
+
+    def __setattr__(self, name: str, value: t.Any) -> None:
+        if name in GLOBAL_FLAG_ATTRIBUTES:
+            # recomputed by the next :meth:`~.cmd`, whose listings may be of
+            # another server. ``_list_cache`` is missing early in ``__init__``.
+            object.__setattr__(self, "_global_flags", None)
+            object.__setattr__(self, "_control_client_failed", False)
+            list_cache = self.__dict__.get("_list_cache")
+            if list_cache is not None:
+                list_cache.clear()
+                self._list_cache_generation += 1
+        object.__setattr__(self, name, value)
+        if name == "control_mode" and not value and "_control_client" in self.__dict__:
+            self.close()
+
+    def _compute_global_flags(self) -> t.Tuple[str, ...]:
+        """
+        Return flags passed to ``tmux(1)`` ahead of every command.
 
-        cmd_args: t.List[t.Union[str, int]] = list(args)
-        if self.socket_name:
-            cmd_args.insert(0, f"-L{self.socket_name}")
-        if self.socket_path:
-            cmd_args.insert(0, f"-S{self.socket_path}")
-        if self.config_file:
-            cmd_args.insert(0, f"-f{self.config_file}")
+        Built from :attr:`~.colors`, :attr:`~.config_file`, :attr:`~.socket_path`
+        and :attr:`~.socket_name`, cached until one of them is set again.
+
+        Returns
+        -------
+        tuple of str
+
+        Raises
+        ------
+        ValueError
+            :attr:`~.colors` is not 88 or 256
+        """
+        prefix: t.List[str] = []
         if self.colors:
             if self.colors == 256:
-                cmd_args.insert(0, "-2")
+                prefix.append("-2")
             elif self.colors == 88:
-                cmd_args.insert(0, "-8")
+                prefix.append("-8")
             else:
                 raise ValueError("Server.colors must equal 88 or 256")
+        if self.config_file:
+            prefix.append(f"-f{self.config_file}")
+        if self.socket_path:
+            prefix.append(f"-S{self.socket_path}")
+        if self.socket_name:
+            prefix.append(f"-L{self.socket_name}")
+        return tuple(prefix)
 
-        return tmux_cmd(*cmd_args, **kwargs)
+    def _get_control_client(self, prefix: t.Tuple[str, ...]) -> ControlMode:
+        """
+        Return running :class:`~libtmux.common.ControlMode` client for ``prefix``.
 
-    def _list_sessions(self) -> t.List[SessionDict]:
+        Started on first use, and again if it exited or global flags changed.
+
+        Raises
+        ------
+        :exc:`exc.ControlModeError`
         """
-        Return list of sessions in :py:obj:`dict` form.
+        # one client per server, a second one would be left running
+        with self._control_client_lock:
+            client = self._control_client
+            if client is not None and (client.args != prefix or not client.alive):
+                self.close()
+                client = None
+
+            if client is None:
+                try:
+                    client = self._control_client = ControlMode(*prefix)
+                except exc.ControlModeError:
+                    # not retried until new-session or a global flag changes
+                    self._control_client_failed = True
+                    raise
+
+            return client
+
+    def _close_unused_control_client(self, client: ControlMode) -> None:
+        """
+        Stop ``client`` if its session is the only one left.
 
-        Retrieved from ``$ tmux(1) list-sessions`` stdout.
+        Raises
+        ------
+        :exc:`exc.ControlModeError`
+        """
+        stdout, _, returncode = client.cmd("list-sessions", "-F#{session_name}")
+        if not returncode and stdout == [CONTROL_MODE_SESSION]:
+            self.close()
 
-        The :py:obj:`list` is derived from ``stdout`` in
-        :class:`common.tmux_cmd` which wraps :py:class:`subprocess.Popen`.
+    def _refresh_all(self) -> t.Dict[str, t.List[str]]:
+        """
+        Fetch sessions, windows and panes in a single ``tmux(1)`` call.
+
+        Chains ``list-sessions``, ``list-windows -a`` and ``list-panes -a``
+        with ``;``. Each row is tagged with ``sessions``, ``windows`` or
+        ``panes`` so one pass over ``stdout`` can tell them apart.
 
         Returns
         -------
-        list of dict
+        dict
+            ``stdout`` rows (tag removed) keyed by tag, also stored in the
+            :attr:`~.cache_ttl` cache unless another command was sent while
+            they were fetched.
+
+        Raises
+        ------
+        :exc:`exc.LibTmuxException`
         """
+        fetched_at = time.monotonic()
+        generation = self._list_cache_generation
+        proc = self.cmd(*_LIST_ALL_ARGS)
 
-        sformats = formats.SESSION_FORMATS
-        tmux_formats = ["#{%s}" % f for f in sformats]
+        if proc.stderr:
+            raise exc.LibTmuxException(proc.stderr)
 
-        tmux_args = ("-F%s" % formats.FORMAT_SEPARATOR.join(tmux_formats),)  # output
+        output: t.Dict[str, t.List[str]] = {
+            "sessions": [],
+            "windows": [],
+            "panes": [],
+        }
+        # stdout is decoded in one go by tmux_cmd, splitting str rows is cheaper
+        # than splitting bytes and decoding each kept value
+        order = {tag: i for i, tag in enumerate(output)}
+        skipped: t.List[str] = []
+        rows: t.List[str] = []
+        current = separators = 0
+        for line in proc.stdout:
+            # tmux prints values as is, so a newline in one splits its row.
+            # Until the row has all its fields, and whenever the tag is unknown
+            # or earlier than the last (tmux lists sessions, windows, then
+            # panes), the line is the rest of a value and never a new row.
+            if rows and rows[-1].count(formats.FORMAT_SEPARATOR) < separators:
+                rows[-1] += "\n" + line
+                continue
+            tag, _, row = line.partition(formats.FORMAT_SEPARATOR)
+            if order.get(tag, -1) < current:
+                if rows:
+                    rows[-1] += "\n" + line
+                continue
+            current = order[tag]
+            separators = _LIST_ALL_SEPARATORS[tag]
+            rows = skipped if row.startswith(_CONTROL_MODE_ROW) else output[tag]
+            rows.append(row)
 
-        list_sessions_cmd = self.cmd("list-sessions", *tmux_args)
+        if skipped and not output["sessions"]:
+            # only the control mode client's session is left, e.g. the last
+            # shell exited
+            self.close()
 
-        if list_sessions_cmd.stderr:
-            raise exc.LibTmuxException(list_sessions_cmd.stderr)
+        # a command sent meanwhile, e.g. from another thread, may have changed
+        # the listing, so only this caller gets it
+        if generation == self._list_cache_generation:
+            for key, rows in output.items():
+                self._list_cache[key] = (fetched_at, rows)
 
-        sformats = formats.SESSION_FORMATS
-        tmux_formats = ["#{%s}" % format for format in sformats]
-        sessions_output = list_sessions_cmd.stdout
+        return output
 
-        # combine format keys with values returned from ``tmux list-sessions``
-        sessions_formatters = [
-            dict(zip(sformats, session.split(formats.FORMAT_SEPARATOR)))
-            for session in sessions_output
-        ]
+    def _cached_list_output(self, key: str) -> t.Optional[t.List[str]]:
+        """
+        Return ``stdout`` rows for ``key`` if fetched within :attr:`~.cache_ttl`.
+
+        Returns
+        -------
+        list of str, or None if there are no fresh rows
+        """
+        cached = self._list_cache.get(key)
+        if cached is not None and time.monotonic() - cached[0] < self.cache_ttl:
+            return cached[1]
+        return None
+
+    def _list_output(self, key: str) -> t.List[str]:
+        """
+        Return ``stdout`` rows for ``key`` from :meth:`~._refresh_all`.
+
+        Rows are reused for :attr:`~.cache_ttl` seconds. Concurrent callers
+        wait on a lock, so only one of them spawns ``tmux(1)``.
+
+        Parameters
+        ----------
+        key : str
+            ``sessions``, ``windows`` or ``panes``
+
+        Returns
+        -------
+        list of str
+        """
+        output = self._cached_list_output(key)
+        if output is not None:
+            return output
+
+        with self._list_cache_lock:
+            # another thread may have refreshed it while we were waiting
+            output = self._cached_list_output(key)
+            if output is not None:
+                return output
+
+            return self._refresh_all()[key]
+
+    def _list_sessions(self) -> t.List[SessionDict]:
+        """
+        Return list of sessions in :py:obj:`dict` form.
 
-        # clear up empty dict
+        Retrieved from ``$ tmux(1) list-sessions`` stdout, see :meth:`~._refresh_all`.
+
+        The :py:obj:`list` is derived from ``stdout`` in
+        :class:`common.tmux_cmd` which wraps :py:class:`subprocess.Popen`.
+
+        Returns
+        -------
+        list of dict
+        """
+
+        sessions_output = self._list_output("sessions")
+
+        # combine format keys with values returned from ``tmux list-sessions``,
+        # skipping empty values
         sessions_formatters_filtered = [
-            {k: v for k, v in session.items() if v} for session in sessions_formatters
+            {
+                k: v
+                for k, v in zip(
+                    _SESSION_KEYS,
+                    session.split(formats.FORMAT_SEPARATOR, len(_SESSION_KEYS) - 1),
+                )
+                if v
+            }
+            for session in sessions_output
         ]
 
         return sessions_formatters_filtered
@@ -202,7 +528,9 @@ class Server(TmuxRelationalObject["Session", "SessionDict"], EnvironmentMixin):
         -------
         list of :class:`Session`
         """
-        return [Session(server=self, **s) for s in self._sessions]
+        sessions = [Session._from_formatter(self, s) for s in self._sessions]
+        self._update_windows()
+        return sessions
 
     @property
     def sessions(self) -> t.List[Session]:
@@ -212,45 +540,42 @@ class Server(TmuxRelationalObject["Session", "SessionDict"], EnvironmentMixin):
     #: Alias :attr:`sessions` for :class:`~libtmux.common.TmuxRelationalObject`
     children = sessions  # type: ignore
 
-    def _list_windows(self) -> t.List[WindowDict]:
+    def _list_windows(
+        self, window_output: t.Optional[t.List[str]] = None
+    ) -> t.List[WindowDict]:
         """
         Return list of windows in :py:obj:`dict` form.
 
-        Retrieved from ``$ tmux(1) list-windows`` stdout.
+        Retrieved from ``$ tmux(1) list-windows`` stdout, see :meth:`~._refresh_all`.
 
         The :py:obj:`list` is derived from ``stdout`` in
         :class:`common.tmux_cmd` which wraps :py:class:`subprocess.Popen`.
 
+        Parameters
+        ----------
+        window_output : list of str, optional
+            rows already fetched by :meth:`~._refresh_all`
+
         Returns
         -------
         list of dict
         """
 
-        wformats = ["session_name", "session_id"] + formats.WINDOW_FORMATS
-        tmux_formats = ["#{%s}" % format for format in wformats]
-
-        proc = self.cmd(
-            "list-windows",  # ``tmux list-windows``
-            "-a",
-            "-F%s" % formats.FORMAT_SEPARATOR.join(tmux_formats),  # output
-        )
-
-        if proc.stderr:
-            raise exc.LibTmuxException(proc.stderr)
+        if window_output is None:
+            window_output = self._list_output("windows")
 
-        window_output = proc.stdout
-
-        wformats = ["session_name", "session_id"] + formats.WINDOW_FORMATS
-
-        # combine format keys with values returned from ``tmux list-windows``
-        window_formatters = [
-            dict(zip(wformats, window.split(formats.FORMAT_SEPARATOR)))
-            for window in window_output
-        ]
-
-        # clear up empty dict
+        # combine format keys with values returned from ``tmux list-windows``,
+        # skipping empty values
         window_formatters_filtered = [
-            {k: v for k, v in window.items() if v} for window in window_formatters
+            {
+                k: v
+                for k, v in zip(
+                    _WINDOW_KEYS,
+                    window.split(formats.FORMAT_SEPARATOR, len(_WINDOW_KEYS) - 1),
+                )
+                if v
+            }
+            for window in window_output
         ]
 
         # tmux < 1.8 doesn't have window_id, use window_name
@@ -258,10 +583,7 @@ class Server(TmuxRelationalObject["Session", "SessionDict"], EnvironmentMixin):
             if "window_id" not in w:
                 w["window_id"] = w["window_name"]
 
-        if self._windows:
-            self._windows[:] = []
-
-        self._windows.extend(window_formatters_filtered)
+        self._windows = window_formatters_filtered
 
         return self._windows
 
@@ -276,63 +598,46 @@ class Server(TmuxRelationalObject["Session", "SessionDict"], EnvironmentMixin):
         self._list_windows()
         return self
 
-    def _list_panes(self) -> t.List[PaneDict]:
+    def _list_panes(
+        self, pane_output: t.Optional[t.List[str]] = None
+    ) -> t.List[PaneDict]:
         """
         Return list of panes in :py:obj:`dict` form.
 
-        Retrieved from ``$ tmux(1) list-panes`` stdout.
+        Retrieved from ``$ tmux(1) list-panes`` stdout, see :meth:`~._refresh_all`.
 
         The :py:obj:`list` is derived from ``stdout`` in
-        :class:`util.tmux_cmd` which wraps :py:class:`subprocess.Popen`.
+        :class:`common.tmux_cmd` which wraps :py:class:`subprocess.Popen`.
+
+        Parameters
+        ----------
+        pane_output : list of str, optional
+            rows already fetched by :meth:`~._refresh_all`
 
         Returns
         -------
         list
         """
 
-        pformats = [
-            "session_name",
-            "session_id",
-            "window_index",
-            "window_id",
-            "window_name",
-        ] + formats.PANE_FORMATS
-        tmux_formats = [("#{%%s}%s" % formats.FORMAT_SEPARATOR) % f for f in pformats]
-
-        proc = self.cmd("list-panes", "-a", "-F%s" % "".join(tmux_formats))  # output
-
-        if proc.stderr:
-            raise exc.LibTmuxException(proc.stderr)
-
-        pane_output = proc.stdout
-
-        pformats = [
-            "session_name",
-            "session_id",
-            "window_index",
-            "window_id",
-            "window_name",
-        ] + formats.PANE_FORMATS
+        if pane_output is None:
+            pane_output = self._list_output("panes")
 
-        # combine format keys with values returned from ``tmux list-panes``
-        pane_formatters = [
-            dict(zip(pformats, formatter.split(formats.FORMAT_SEPARATOR)))
-            for formatter in pane_output
-        ]
-
-        # Filter empty values
+        # combine format keys with values returned from ``tmux list-panes``,
+        # skipping empty values
         pane_formatters_filtered = [
             {
-                k: v for k, v in formatter.items() if v or k == "pane_current_path"
+                k: v
+                for k, v in zip(
+                    _PANE_KEYS,
+                    formatter.split(formats.FORMAT_SEPARATOR, len(_PANE_KEYS) - 1),
+                )
+                if v or k == "pane_current_path"
             }  # preserve pane_current_path, in case it entered a new process
             # where we may not get a cwd from.
-            for formatter in pane_formatters
+            for formatter in pane_output
         ]
 
-        if self._panes:
-            self._panes[:] = []
-
-        self._panes.extend(pane_formatters_filtered)
+        self._panes = pane_formatters_filtered
 
         return self._panes
 
@@ -347,6 +652,22 @@ class Server(TmuxRelationalObject["Session", "SessionDict"], EnvironmentMixin):
         self._list_panes()
         return self
 
+    def _update_all(self) -> "Server":
+        """
+        Update internal window and pane data from one ``tmux(1)`` call.
+
+        Like :meth:`~._update_windows` and :meth:`~._update_panes` combined, via
+        :meth:`~._refresh_all`.
+
+        Returns
+        -------
+        :class:`Server`
+        """
+        output = self._refresh_all()
+        self._list_windows(output["windows"])
+        self._list_panes(output["panes"])
+        return self
+
     @property
     def attached_sessions(self) -> t.Optional[t.List[Session]]:
         """
@@ -357,19 +678,17 @@ class Server(TmuxRelationalObject["Session", "SessionDict"], EnvironmentMixin):
         list of :class:`Session`
         """
 
-        sessions = self._sessions
-        attached_sessions = list()
-
-        for session in sessions:
-            attached = session.get("session_attached")
-            # for now session_active is a unicode
-            if attached != "0":
-                logger.debug("session %s attached", session.get("name"))
-                attached_sessions.append(session)
-            else:
-                continue
+        # for now session_attached is a unicode
+        attached_sessions = [
+            Session._from_formatter(self, s)
+            for s in self._sessions
+            if s.get("session_attached", "0") != "0"
+        ]
+        if not attached_sessions:
+            return None
 
-        return [Session(server=self, **s) for s in attached_sessions] or None
+        self._update_windows()
+        return attached_sessions
 
     def has_session(self, target_session: str, exact: bool = True) -> bool:
         """
@@ -394,19 +713,68 @@ class Server(TmuxRelationalObject["Session", "SessionDict"], EnvironmentMixin):
         """
         session_check_name(target_session)
 
-        if exact and has_gte_version("2.1"):
+        if exact and _has_gte_version("2.1"):
+            # answer from recently listed sessions' names and ids, unless a
+            # value held the separator and shifted the fields
+            sessions_output = self._cached_list_output("sessions")
+            separators = _LIST_ALL_SEPARATORS["sessions"]
+            if sessions_output is not None and all(
+                row.count(formats.FORMAT_SEPARATOR) == separators
+                for row in sessions_output
+            ):
+                for row in sessions_output:
+                    fields = row.split(formats.FORMAT_SEPARATOR, _SESSION_ID_FIELD + 1)
+                    if target_session in (fields[0], fields[_SESSION_ID_FIELD]):
+                        return True
+                # tmux also takes client names, ttys or client-<pid>, which
+                # aren't listed
+                if "/" not in target_session and not target_session.startswith(
+                    ("tty", "client-")
+                ):
+                    return False
+
             target_session = f"={target_session}"
 
-        proc = self.cmd("has-session", "-t%s" % target_session)
+        proc = self.cmd("has-session", f"-t{target_session}")
 
         if not proc.returncode:
             return True
 
         return False
 
+    def close(self) -> None:
+        """
+        Stop the :attr:`~.control_mode` client, if any.
+
+        Its session is destroyed with it, and the server exits if no other
+        session is left. The next command starts a new client.
+
+        Examples
+        --------
+        >>> with Server(socket_name=server.socket_name, control_mode=True) as s:
+        ...     s.has_session(session.get('session_name'))
+        True
+        """
+        with self._control_client_lock:
+            if self._control_client is not None:
+                self._control_client.close()
+                self._control_client = None
+
+    def __enter__(self) -> "Server":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: t.Optional[t.Type[BaseException]],
+        exc_value: t.Optional[BaseException],
+        exc_tb: t.Optional[TracebackType],
+    ) -> None:
+        self.close()
+
     def kill_server(self) -> None:
         """``$ tmux kill-server``."""
         self.cmd("kill-server")
+        self.close()
 
     def kill_session(self, target_session: t.Union[str, int]) -> "Server":
         """
@@ -426,7 +794,7 @@ class Server(TmuxRelationalObject["Session", "SessionDict"], EnvironmentMixin):
         ------
         :exc:`exc.BadSessionName`
         """
-        proc = self.cmd("kill-session", "-t%s" % target_session)
+        proc = self.cmd("kill-session", f"-t{target_session}")
 
         if proc.stderr:
             raise exc.LibTmuxException(proc.stderr)
@@ -448,7 +816,7 @@ class Server(TmuxRelationalObject["Session", "SessionDict"], EnvironmentMixin):
         """
         session_check_name(target_session)
 
-        proc = self.cmd("switch-client", "-t%s" % target_session)
+        proc = self.cmd("switch-client", f"-t{target_session}")
 
         if proc.stderr:
             raise exc.LibTmuxException(proc.stderr)
@@ -469,7 +837,7 @@ class Server(TmuxRelationalObject["Session", "SessionDict"], EnvironmentMixin):
 
         tmux_args: t.Tuple[str, ...] = tuple()
         if target_session:
-            tmux_args += ("-t%s" % target_session,)
+            tmux_args += (f"-t{target_session}",)
 
         proc = self.cmd("attach-session", *tmux_args)
 
@@ -557,65 +925,61 @@ class Server(TmuxRelationalObject["Session", "SessionDict"], EnvironmentMixin):
 
             if self.has_session(session_name):
                 if kill_session:
-                    self.cmd("kill-session", "-t%s" % session_name)
-                    logger.info("session %s exists. killed it." % session_name)
+                    self.cmd("kill-session", f"-t{session_name}")
+                    logger.info(f"session {session_name} exists. killed it.")
                 else:
-                    raise exc.TmuxSessionExists(
-                        "Session named %s exists" % session_name
-                    )
+                    raise exc.TmuxSessionExists(f"Session named {session_name} exists")
 
-        logger.debug("creating session %s" % session_name)
+        logger.debug(f"creating session {session_name}")
 
-        sformats = formats.SESSION_FORMATS
-        tmux_formats = ["#{%s}" % f for f in sformats]
+        env = os.environ.pop("TMUX", None)
 
-        env = os.environ.get("TMUX")
+        try:
+            tmux_args: t.Tuple[t.Union[str, int], ...] = (
+                "-P",
+                _SESSION_FMT,  # output
+            )
 
-        if env:
-            del os.environ["TMUX"]
+            if session_name is not None:
+                tmux_args += (f"-s{session_name}",)
 
-        tmux_args: t.Tuple[t.Union[str, int], ...] = (
-            "-P",
-            "-F%s" % formats.FORMAT_SEPARATOR.join(tmux_formats),  # output
-        )
+            if not attach:
+                tmux_args += ("-d",)
 
-        if session_name is not None:
-            tmux_args += (f"-s{session_name}",)
+            if start_directory:
+                tmux_args += ("-c", start_directory)
 
-        if not attach:
-            tmux_args += ("-d",)
+            if window_name:
+                tmux_args += ("-n", window_name)
 
-        if start_directory:
-            tmux_args += ("-c", start_directory)
+            # tmux 2.6 gives unattached sessions a tiny default area
+            # no need send in -x/-y if they're in a client already, though
+            if _has_gte_version("2.6") and "TMUX" not in os.environ:
+                tmux_args += ("-x", 800, "-y", 600)
 
-        if window_name:
-            tmux_args += ("-n", window_name)
+            if window_command:
+                tmux_args += (window_command,)
 
-        # tmux 2.6 gives unattached sessions a tiny default area
-        # no need send in -x/-y if they're in a client already, though
-        if has_gte_version("2.6") and "TMUX" not in os.environ:
-            tmux_args += ("-x", 800, "-y", 600)
-
-        if window_command:
-            tmux_args += (window_command,)
-
-        proc = self.cmd("new-session", *tmux_args)
+            proc = self.cmd("new-session", *tmux_args)
+        finally:
+            if env is not None:
+                os.environ["TMUX"] = env
 
         if proc.stderr:
             raise exc.LibTmuxException(proc.stderr)
 
         session_stdout = proc.stdout[0]
 
-        if env:
-            os.environ["TMUX"] = env
-
-        # Combine format keys with values returned from ``tmux list-windows``
-        session_params = dict(
-            zip(sformats, session_stdout.split(formats.FORMAT_SEPARATOR))
-        )
-
-        # Filter empty values
-        session_params = {k: v for k, v in session_params.items() if v}
+        # Combine format keys with values returned from ``tmux list-windows``,
+        # skipping empty values
+        session_params = {
+            k: v
+            for k, v in zip(
+                _SESSION_KEYS,
+                session_stdout.split(formats.FORMAT_SEPARATOR, len(_SESSION_KEYS) - 1),
+            )
+            if v
+        }
 
         session = Session(server=self, **session_params)
 
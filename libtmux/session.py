@@ -84,6 +84,24 @@ class Session(
         self._session_id = session_id
         self.server._update_windows()
 
+    @classmethod
+    def _from_formatter(cls, server: "Server", session: SessionDict) -> "Session":
+        """
+        Return :class:`Session` for a ``list-sessions`` row of ``server``.
+
+        Skips ``**kwargs`` unpacking and, unlike ``__init__``, doesn't update the
+        server's windows; callers building many sessions do that once.
+
+        Returns
+        -------
+        :class:`Session`
+        """
+        obj = cls.__new__(cls)
+        EnvironmentMixin.__init__(obj)
+        obj.server = server
+        obj._session_id = session["session_id"]
+        return obj
+
     @property
     def _info(self) -> t.Optional[SessionDict]:  # type: ignore  # mypy#1362
         attrs = {"session_id": str(self._session_id)}
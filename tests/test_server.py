@@ -1,19 +1,91 @@
 """Test for libtmux Server object."""
 import logging
-
-from libtmux.common import has_gte_version
-from libtmux.server import Server
+import os
+import pathlib
+import threading
+import typing as t
+
+import pytest
+
+from libtmux import exc, formats
+from libtmux.common import (
+    CONTROL_MODE_SESSION,
+    ControlMode,
+    control_mode_cmd,
+    has_gte_version,
+    tmux_cmd,
+)
+from libtmux.server import _PANE_KEYS, Server
 from libtmux.session import Session
+from libtmux.test import retry_until
 
 logger = logging.getLogger(__name__)
 
 
+@pytest.fixture
+def cmd_calls(
+    server: Server, monkeypatch: pytest.MonkeyPatch
+) -> t.List[t.Tuple[t.Any, ...]]:
+    """Arguments of each :meth:`Server.cmd` call from here on."""
+    calls: t.List[t.Tuple[t.Any, ...]] = []
+    server_cmd = server.cmd
+
+    def cmd(*args: t.Any, **kwargs: t.Any) -> tmux_cmd:
+        calls.append(args)
+        return server_cmd(*args, **kwargs)
+
+    monkeypatch.setattr(server, "cmd", cmd)
+    return calls
+
+
 def test_has_session(server: Server, session: Session) -> None:
     session_name = session.get("session_name")
     assert session_name is not None
     assert server.has_session(session_name)
     assert not server.has_session("asdf2314324321")
 
+    new_session = server.new_session("alpha")
+    session_id = new_session.get("session_id")
+    assert session_id is not None
+    assert server.has_session(session_id)
+
+
+def test_has_session_cached(
+    server: Server, session: Session, cmd_calls: t.List[t.Tuple[t.Any, ...]]
+) -> None:
+    """Server.has_session answers from freshly listed sessions."""
+    session_name = session.get("session_name")
+    assert session_name is not None
+    server.cache_ttl = 60
+    server._list_sessions()
+    cmd_calls.clear()
+
+    assert server.has_session(session_name)
+    assert not server.has_session(session_name[:-2])
+    assert not server.has_session("asdf2314324321")
+    assert cmd_calls == []
+
+    # tmux takes session ids too
+    session_id = session.get("session_id")
+    assert session_id is not None
+    assert server.has_session(session_id)
+    assert not server.has_session("$2314324321")
+    assert cmd_calls == []
+
+    # client names aren't listed, tmux is asked
+    assert not server.has_session("/dev/pts/2314324321")
+    assert [args[0] for args in cmd_calls] == ["has-session"]
+    cmd_calls.clear()
+
+    assert server.has_session(session_name[:-2], exact=False)
+    assert [args[0] for args in cmd_calls] == ["has-session"]
+
+    # "a|b" shifts the fields of its row, so tmux is asked instead
+    server.cmd("new-session", "-d", "-sa|b")
+    server._list_sessions()
+    assert server.has_session("a|b")
+    assert not server.has_session("a")
+
 
 def test_socket_name(server: Server) -> None:
     """``-L`` socket_name.
@@ -60,6 +132,17 @@ def test_88_colors(server: Server) -> None:
     assert "-2" not in proc.cmd
 
 
+def test_cmd_global_flags_order(server: Server) -> None:
+    """Global flags come before the tmux command, in a stable order."""
+    myserver = Server(
+        socket_name="test", socket_path="/tmp/test", config_file="test", colors=256
+    )
+
+    proc = myserver.cmd("list-sessions")
+
+    assert proc.cmd[1:] == ["-2", "-ftest", "-S/tmp/test", "-Ltest", "list-sessions"]
+
+
 def test_show_environment(server: Server) -> None:
     """Server.show_environment() returns dict."""
     _vars = server.show_environment()
@@ -106,6 +189,28 @@ def test_new_session_no_name(server: Server) -> None:
     assert server.has_session(second_session_name)
 
 
+def test_new_session_restores_tmux_env(
+    server: Server, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Server.new_session puts $TMUX back even if tmux(1) fails"""
+    monkeypatch.setenv("TMUX", "/tmp/tmux-1000/default,1,0")
+
+    server_cmd = server.cmd
+
+    def cmd(*args: t.Any, **kwargs: t.Any) -> tmux_cmd:
+        if args[0] != "new-session":
+            return server_cmd(*args, **kwargs)
+        assert "TMUX" not in os.environ
+        raise exc.LibTmuxException("new-session failed")
+
+    monkeypatch.setattr(server, "cmd", cmd)
+
+    with pytest.raises(exc.LibTmuxException):
+        server.new_session()
+
+    assert os.environ["TMUX"] == "/tmp/tmux-1000/default,1,0"
+
+
 def test_new_session_shell(server: Server) -> None:
     """Server.new_session creates and returns valid session running with
     specified command"""
@@ -123,3 +228,312 @@ def test_new_session_shell(server: Server) -> None:
         assert pane_start_command.replace('"', "") == cmd
     else:
         assert pane_start_command == cmd
+
+
+def test_list_cache(
+    server: Server, session: Session, cmd_calls: t.List[t.Tuple[t.Any, ...]]
+) -> None:
+    """Rapid ``list-*`` calls reuse output until another command runs."""
+    server.cache_ttl = 60
+    server._list_sessions()
+    cmd_calls.clear()
+
+    server._list_sessions()
+    server._list_sessions()
+    assert cmd_calls == []
+
+    new_session = server.new_session("test_list_cache")
+    assert new_session.get("session_name") == "test_list_cache"
+    commands = [args[0] for args in cmd_calls]
+    assert "new-session" in commands
+    assert "list-sessions" in commands
+
+    server.cache_ttl = 0
+    cmd_calls.clear()
+    server._list_sessions()
+    server._list_sessions()
+    assert [args[0] for args in cmd_calls] == ["list-sessions", "list-sessions"]
+
+
+def test_refresh_all(
+    server: Server, session: Session, cmd_calls: t.List[t.Tuple[t.Any, ...]]
+) -> None:
+    """Sessions, windows and panes are listed by one tmux invocation."""
+    output = server._refresh_all()
+    assert len(cmd_calls) == 1
+    assert cmd_calls[0].count(";") == 2
+
+    assert len(output["sessions"]) == len(server._list_sessions())
+    assert len(output["windows"]) == len(server._list_windows())
+    assert len(output["panes"]) == len(server._list_panes())
+    assert session.get("session_id") in [
+        s["session_id"] for s in server._list_sessions()
+    ]
+
+
+def test_attached_sessions_none(server: Server, session: Session) -> None:
+    """Server.attached_sessions is None when no client is attached."""
+    assert server.attached_sessions is None
+
+
+def test_list_panes_fields(server: Server, session: Session) -> None:
+    """list-panes rows have exactly one field per key."""
+    for row in server._list_output("panes"):
+        assert len(row.split(formats.FORMAT_SEPARATOR)) == len(_PANE_KEYS)
+
+
+def test_refresh_all_concurrent_command(
+    server: Server, session: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Output fetched while another command was sent isn't cached."""
+    server.cache_ttl = 60
+    concurrent = [("new-session", "-d", "-sconcurrent")]
+    server_cmd = server.cmd
+
+    def cmd(*args: t.Any, **kwargs: t.Any) -> tmux_cmd:
+        proc = server_cmd(*args, **kwargs)
+        if args[0] == "list-sessions" and concurrent:
+            server_cmd(*concurrent.pop())
+        return proc
+
+    monkeypatch.setattr(server, "cmd", cmd)
+    output = server._refresh_all()
+    assert output["sessions"]
+    assert server._cached_list_output("sessions") is None
+    assert "concurrent" in [s["session_name"] for s in server._list_sessions()]
+
+    # listed after the command was sent, but before tmux ran it
+    def listing_tmux_cmd(*args: t.Any, **kwargs: t.Any) -> tmux_cmd:
+        if "new-window" in args:
+            server._refresh_all()
+        return tmux_cmd(*args, **kwargs)
+
+    monkeypatch.setattr(server, "cmd", server_cmd)
+    monkeypatch.setattr("libtmux.server.tmux_cmd", listing_tmux_cmd)
+    window_id = server.cmd("new-window", "-P", "-F#{window_id}").stdout[0]
+    assert window_id in [w["window_id"] for w in server._list_windows()]
+
+
+def test_refresh_all_newline_in_value(
+    server: Server, session: Session, tmp_path: pathlib.Path
+) -> None:
+    """A newline in a listed value neither breaks nor adds rows."""
+    start_directory = tmp_path / "x\nsessions|evil"
+    start_directory.mkdir()
+    server.new_session(session_name="newline", start_directory=str(start_directory))
+
+    output = server._refresh_all()
+    assert "evil" not in [s["session_name"] for s in server._list_sessions()]
+    assert len(output["sessions"]) == len(server.cmd("list-sessions").stdout)
+
+    panes = [row for row in output["panes"] if row.startswith("newline")]
+    assert len(panes) == 1
+    assert str(start_directory) in panes[0]
+
+
+@pytest.mark.skipif(not has_gte_version("3.2"), reason="needs tmux 3.2+ client flags")
+def test_control_mode(server: Server, session: Session) -> None:
+    """Commands go through one ``tmux -C`` client when control_mode is set."""
+    server.control_mode = True
+
+    proc = server.cmd("display-message", "-p", "it's #{version}")
+    assert isinstance(proc, control_mode_cmd)
+    assert proc.stdout == [
+        "it's " + server.cmd("display-message", "-p", "#{version}").stdout[0]
+    ]
+    assert server._control_client is not None
+    assert server._control_client.alive
+
+    # newlines can't be sent to the client, which is kept
+    client = server._control_client
+    proc = server.cmd("display-message", "-p", "a\nb")
+    assert not isinstance(proc, control_mode_cmd)
+    assert proc.stdout == ["a", "b"]
+    assert server._control_client is client
+
+    # keyword arguments are for tmux_cmd, which still runs them
+    proc = server.cmd("display-message", "-p", "a", option=True)
+    assert not isinstance(proc, control_mode_cmd)
+    assert proc.stdout == ["a"]
+
+    session_name = session.get("session_name")
+    assert session_name is not None
+    assert server.has_session(session_name)
+    assert not server.has_session("asdf2314324321")
+
+    # chained commands stop at the first error, as with a new tmux client
+    proc = server.cmd(
+        "display-message",
+        "-p",
+        "a",
+        ";",
+        "has-session",
+        "-t",
+        "=nope",
+        ";",
+        "display-message",
+        "-p",
+        "b",
+    )
+    assert proc.stdout == ["a"]
+    assert proc.stderr
+    assert proc.returncode == 1
+
+    # the client's own session is hidden
+    assert CONTROL_MODE_SESSION not in [s.get("session_name") for s in server.sessions]
+    window = session.new_window(window_name="control_mode")
+    assert window in session.windows
+
+    server.kill_server()
+    assert server._control_client is None
+    assert not server.has_session(session_name)
+    assert server._control_client is None
+
+
+@pytest.mark.skipif(not has_gte_version("3.2"), reason="needs tmux 3.2+ client flags")
+def test_control_mode_start_failed(
+    server: Server, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """A client that failed to start is not retried until ``new-session``."""
+    started = []
+
+    class CountingControlMode(ControlMode):
+        def __init__(self, *args: str) -> None:
+            started.append(args)
+            super().__init__(*args)
+
+    monkeypatch.setattr("libtmux.server.ControlMode", CountingControlMode)
+    server.control_mode = True
+
+    # no server is running, and the client won't start one
+    assert not isinstance(server.cmd("list-sessions"), control_mode_cmd)
+    assert not isinstance(server.cmd("list-sessions"), control_mode_cmd)
+    assert len(started) == 1
+
+    server.new_session(session_name="control_mode")
+    assert isinstance(server.cmd("list-sessions"), control_mode_cmd)
+    assert len(started) == 2
+
+
+@pytest.mark.skipif(not has_gte_version("3.2"), reason="needs tmux 3.2+ client flags")
+def test_control_mode_lifetime(server: Server) -> None:
+    """The control mode client doesn't keep the server running."""
+    server.control_mode = True
+    server.new_session(session_name="lifetime")
+    with Server(socket_name=server.socket_name, control_mode=True) as other:
+        assert other.has_session("lifetime")
+        client = other._control_client
+        assert client is not None
+    assert other._control_client is None
+    assert not client.alive
+
+    assert server.has_session("lifetime")
+    assert server._control_client is not None
+    server.kill_session("lifetime")
+    assert server._control_client is None
+    retry_until(lambda: server.cmd("list-sessions").returncode != 0, 1)
+
+
+@pytest.mark.skipif(not has_gte_version("3.2"), reason="needs tmux 3.2+ client flags")
+def test_control_mode_one_client(
+    server: Server, session: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Threads share one client, stopped when control_mode is turned off."""
+    started = []
+
+    class CountingControlMode(ControlMode):
+        def __init__(self, *args: str) -> None:
+            started.append(args)
+            super().__init__(*args)
+
+    monkeypatch.setattr("libtmux.server.ControlMode", CountingControlMode)
+    server.control_mode = True
+
+    barrier = threading.Barrier(8)
+
+    def display_message() -> None:
+        barrier.wait()
+        server.cmd("display-message", "-p", "a")
+
+    threads = [threading.Thread(target=display_message) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(started) == 1
+
+    client = server._control_client
+    assert client is not None
+    server.control_mode = False
+    assert server._control_client is None
+    assert not client.alive
+
+
+@pytest.mark.skipif(not has_gte_version("3.2"), reason="needs tmux 3.2+ client flags")
+def test_control_mode_kill_not_resent(
+    server: Server, session: Session, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """A ``kill-*`` command run through the client is never sent again."""
+    server.control_mode = True
+    window_id = session.new_window(window_name="kill").get("window_id")
+    assert window_id is not None
+
+    def close_unused_control_client(client: ControlMode) -> None:
+        raise exc.ControlModeError("tmux control mode client exited")
+
+    monkeypatch.setattr(
+        server, "_close_unused_control_client", close_unused_control_client
+    )
+    proc = server.cmd("kill-window", "-t", window_id)
+    assert isinstance(proc, control_mode_cmd)
+    assert proc.returncode == 0
+    assert server._control_client is None
+
+
+def test_update_all(
+    server: Server, session: Session, cmd_calls: t.List[t.Tuple[t.Any, ...]]
+) -> None:
+    """Server._update_all refreshes windows and panes with one tmux call."""
+    window_id = session.attached_window.get("window_id")
+    server.cache_ttl = 0
+    server._windows = []
+    server._panes = []
+    cmd_calls.clear()
+
+    assert server._update_all() is server
+    assert [args[0] for args in cmd_calls] == ["list-sessions"]
+
+    assert window_id in [w["window_id"] for w in server._windows]
+    assert window_id in [p["window_id"] for p in server._panes]
+
+
+def test_global_flags_follow_attributes(server: Server, session: Session) -> None:
+    """Global flags are cached, and rebuilt when their attribute changes."""
+    myserver = Server(socket_name="test")
+    assert myserver.cmd("list-sessions").cmd[1:] == ["-Ltest", "list-sessions"]
+
+    myserver.socket_name = "test2"
+    myserver.colors = 88
+    assert myserver.cmd("list-sessions").cmd[1:] == ["-8", "-Ltest2", "list-sessions"]
+
+    myserver.colors = 16
+    with pytest.raises(ValueError):
+        myserver.cmd("list-sessions")
+
+    # listings of the previous server are not reused
+    session_name = session.get("session_name")
+    assert session_name is not None
+    socket_name = server.socket_name
+    other = Server(socket_name=f"{socket_name}_other")
+    other.cmd("new-session", "-d", "-sother")
+    try:
+        server.cache_ttl = 60
+        server._list_sessions()
+        assert server.has_session(session_name)
+        server.socket_name = other.socket_name
+        assert [s["session_name"] for s in server._list_sessions()] == ["other"]
+        assert server.has_session("other")
+        assert not server.has_session(session_name)
+    finally:
+        server.socket_name = socket_name
+        other.kill_server()
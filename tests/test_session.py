@@ -26,6 +26,18 @@ def test_has_session(server: Server, session: Session) -> None:
     assert not server.has_session("asdf2314324321")
 
 
+def test_from_formatter(server: Server, session: Session) -> None:
+    """Session._from_formatter matches a Session built via __init__."""
+    info = session._info
+    assert info is not None
+    from_formatter = Session._from_formatter(server, info)
+
+    assert isinstance(from_formatter, Session)
+    assert from_formatter.id == session.id
+    assert from_formatter == session
+    assert from_formatter.windows == session.windows
+
+
 def test_select_window(session: Session) -> None:
     """Session.select_window moves window."""
     # get the current window_base_index, since different user tmux config